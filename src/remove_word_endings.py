@@ -32,7 +32,6 @@ WORD_ENDINGS = [
     'us',
     'u',
 ]
-ROOT_REGEX = re.compile(fr'(\w+)({"|".join(WORD_ENDINGS)})$')
 CORRELATIVES = {
     'kia',
     'tia',
@@ -56,9 +55,12 @@ CORRELATIVES = {
     'neniu',
 }
 CORRELATIVE_ENDINGS = {'', 'j', 'jn', 'n'}
-CORRELATIVE_REGEX = re.compile(
-    f'({"|".join(CORRELATIVES)})({"|".join(CORRELATIVE_ENDINGS)})$'
-)
+# All inflected correlative forms, mapped to their roots
+CORRELATIVE_FORMS = {
+    correlative + ending: correlative
+    for correlative in CORRELATIVES
+    for ending in CORRELATIVE_ENDINGS
+}
 STANDALONE_WORDS = {
     'ajn',
     'ĉi',
@@ -80,21 +82,52 @@ STANDALONE_WORDS = {
 }
 
 
-def _remove_invalid_words(words: Iterable[str]) -> set[str]:
-    return [word for word in words if len(word) > 1 and not re.search('[ -.]', word)]
+def _build_suffix_trie(endings: Iterable[str]) -> dict:
+    """Build a reversed-character trie mapping each ending to its length"""
+    trie = {}
+    for ending in endings:
+        node = trie
+        for char in reversed(ending):
+            node = node.setdefault(char, {})
+        # The sentinel key '' marks a terminal node
+        node[''] = len(ending)
+
+    return trie
+
+
+ENDING_TRIE = _build_suffix_trie(WORD_ENDINGS)
+
+INVALID_CHAR_REGEX = re.compile('[ -.]')
 
 
-def _remove_word_endings(words: Iterable[str]) -> set[str]:
+def _extract_roots(words: Iterable[str]) -> set[str]:
+    """Validate words and strip their endings in a single pass"""
+    # Bind globals to locals to skip dict lookups in the hot loop
+    search_invalid_char = INVALID_CHAR_REGEX.search
+    standalone_words = STANDALONE_WORDS
+    correlative_forms = CORRELATIVE_FORMS
+    ending_trie = ENDING_TRIE
+
     roots = set()
     for word in words:
-        if word in STANDALONE_WORDS:
+        if len(word) <= 1 or search_invalid_char(word):
+            continue
+
+        if word in standalone_words:
             root = word
-        elif match := CORRELATIVE_REGEX.search(word):
-            root = match.group(1)
-        elif match := ROOT_REGEX.search(word):
-            root = match.group(1)
+        elif word in correlative_forms:
+            root = correlative_forms[word]
         else:
-            root = word
+            node = ending_trie
+            ending_length = 0
+            for char in reversed(word):
+                node = node.get(char)
+                if node is None:
+                    break
+                if '' in node:
+                    ending_length = node['']
+
+            root = word[:-ending_length] if 0 < ending_length < len(word) else word
 
         roots.add(root)
 
@@ -108,8 +141,7 @@ def main(_argv) -> None:
     words = read_words(done_path)
     logging.info(f'num of words: {len(words):,}')
 
-    words = _remove_invalid_words(words)
-    roots = _remove_word_endings(words)
+    roots = _extract_roots(words)
     logging.info(f'num of roots: {len(roots):,}')
 
     save_words(roots, result_dir / REMOVED_FILE)
@@ -3,12 +3,16 @@ import pathlib
 import re
 import time
 import traceback
+from collections import deque
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 from absl import app
 from absl import flags
 from absl import logging
 from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver import ChromeOptions
@@ -18,7 +22,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
-from utils import read_words, save_words
+from utils import esorted, read_words, save_words
 
 FLAGS = flags.FLAGS
 flags.DEFINE_string('output_dir', 'results', 'Directory path to save results')
@@ -32,6 +36,16 @@ FIRST_WORD = 'ktp'
 
 URL = 'https://vortaro.net/#{}_kdc'
 TIMEOUT = 5
+# Minimum seconds per iteration, to avoid hammering the site
+REQUEST_INTERVAL = 1
+# How many html pages to buffer before writing them to disk
+HTML_FLUSH_EVERY = 32
+
+SKIP_WORDS = frozenset({'-½exp', '½exp', 'å', 'être'})
+PUNCT_TABLE = str.maketrans('', '', '?!')
+
+TOKEN_REGEX = re.compile(r'[-\w]+')
+INVALID_WORD_REGEX = re.compile(r'[\d①-⑨]')
 
 
 class ScrapingProcessor:
@@ -40,6 +54,8 @@ class ScrapingProcessor:
 
         self.html_dir = output_dir / HTML_DIR
         self.html_dir.mkdir(parents=True, exist_ok=True)
+        # Fetched pages are buffered here and written in batches
+        self._pending_htmls: list[tuple[pathlib.Path, bytes]] = []
 
         self.not_yet_path = output_dir / NOT_YET_FILE
         self.done_path = output_dir / DONE_FILE
@@ -48,6 +64,9 @@ class ScrapingProcessor:
         self.not_yet = read_words(self.not_yet_path)
         if not self.not_yet:
             self.not_yet.add(FIRST_WORD)
+        # Process words in a deterministic order;
+        # self.not_yet mirrors the queue for O(1) membership tests
+        self.not_yet_queue = deque(esorted(self.not_yet))
         self.done = read_words(self.done_path)
         self.no_results = read_words(self.no_results_path)
 
@@ -62,24 +81,39 @@ class ScrapingProcessor:
         2. Extract all the words on the given page
         3. Repeat 1-2 until all the words used on PIV have been searched
         """
+        # Pages are parsed in a background worker,
+        # so the next fetch can start while the previous page is parsed
+        pool = ThreadPoolExecutor(max_workers=1)
+        parsing = None
+        search_word = None
         try:
-            while self.not_yet:
+            while self.not_yet or parsing is not None:
                 start_time = time.perf_counter()
 
-                search_word = self.not_yet.pop()
-                success, html = self._fetch_html(search_word)
-                if success:
-                    self.done.add(search_word)
-                    words = _extract_words(html.lower())
-                    self.not_yet |= words - self.done - self.no_results
-                else:
-                    self.no_results.add(search_word)
+                search_word = html = None
+                if self.not_yet:
+                    search_word = self.not_yet_queue.popleft()
+                    self.not_yet.discard(search_word)
+                    success, html = self._fetch_html(search_word)
+                    if success:
+                        self.done.add(search_word)
+                    else:
+                        self.no_results.add(search_word)
+
+                # Merge the words parsed during the fetch above
+                # (clear parsing first so a failed result is not fetched twice)
+                if parsing is not None:
+                    parsed, parsing = parsing, None
+                    self._merge_new_words(parsed.result())
+                if html is not None:
+                    parsing = pool.submit(_extract_words, html.lower())
 
                 if FLAGS.save_html and html is not None:
                     # To avoid "OSError: invalid argument"
-                    self.html_dir.joinpath(
-                        f'{search_word.replace("?", "_")}.txt'
-                    ).write_text(html, encoding='utf-8')
+                    html_path = self.html_dir / f'{search_word.replace("?", "_")}.txt'
+                    self._pending_htmls.append((html_path, html.encode('utf-8')))
+                    if len(self._pending_htmls) >= HTML_FLUSH_EVERY:
+                        self._flush_htmls()
 
                 end_time = time.perf_counter() - start_time
                 remaining_time = self._update_timer(end_time)
@@ -90,18 +124,53 @@ class ScrapingProcessor:
                     f'no_results: {len(self.no_results):,} '
                     f'(remaining {datetime.timedelta(seconds=remaining_time)})'
                 )
-                time.sleep(1)
+                # Only sleep for what is left of the interval;
+                # fetching and parsing already count towards it
+                time.sleep(
+                    max(0.0, REQUEST_INTERVAL - (time.perf_counter() - start_time))
+                )
 
         # Because "Exception" does not catch "KeyboardInterrupt"
         except BaseException as e:
-            self.not_yet.add(search_word)
+            if search_word is not None:
+                self.not_yet.add(search_word)
+                self.not_yet_queue.appendleft(search_word)
             logging.info(
                 f'Interrupted by {e.__class__.__name__}' f'(search_word: {search_word})'
             )
             logging.info(f'Error message:\n{traceback.format_exc()}')
 
+        finally:
+            # Keep the words from a parse that was still in flight;
+            # never let it raise, so that save() always runs afterwards
+            if parsing is not None:
+                try:
+                    self._merge_new_words(parsing.result())
+                except BaseException:
+                    logging.info(f'Error message:\n{traceback.format_exc()}')
+            pool.shutdown()
+
+    def _merge_new_words(self, words: set[str]) -> None:
+        """Add words that have not been searched yet to the queue"""
+        new_words = [
+            word
+            for word in words
+            if word not in self.done
+            and word not in self.no_results
+            and word not in self.not_yet
+        ]
+        self.not_yet.update(new_words)
+        self.not_yet_queue.extend(esorted(new_words))
+
+    def _flush_htmls(self) -> None:
+        """Write buffered html pages to disk"""
+        for html_path, data in self._pending_htmls:
+            html_path.write_bytes(data)
+        self._pending_htmls.clear()
+
     def save(self) -> None:
         """Save words"""
+        self._flush_htmls()
         if not self.not_yet:
             self.done = _postprocess(self.done)
 
@@ -125,7 +194,8 @@ class ScrapingProcessor:
             return False, None
 
         page_source = self.driver.page_source
-        soup = BeautifulSoup(page_source, 'html.parser')
+        # Restrict parsing to <main> since only .artikoloj inside it is needed
+        soup = BeautifulSoup(page_source, 'lxml', parse_only=SoupStrainer('main'))
         html = str(soup.main.find(class_='artikoloj'))
 
         return True, html
@@ -142,21 +212,22 @@ class ScrapingProcessor:
 def _extract_words(html: str) -> set[str]:
     """Extract words from html"""
     words = set()
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = BeautifulSoup(html, 'lxml')
     # Delete symbols (which is tagged by <... class="...tooltipstered...">)
     # (memo) In this way, abbreviations (tagged by <abbr>) will be also deleted
-    for symbol_tag in soup.find_all(class_=re.compile('.*tooltipstered.*')):
+    for symbol_tag in soup.select('[class*="tooltipstered"]'):
         symbol_tag.decompose()
     # Extract headwords (which is often separated by "/")
-    for headword_tag in soup.find_all('strong', class_='kapvorto'):
+    for headword_tag in soup.select('strong.kapvorto'):
         words.add(headword_tag.text.replace('/', ''))
     # Extract explanations of the headwords
-    for sense_tag in soup.find_all('div', class_='div senco'):
+    for sense_tag in soup.select('div[class="div senco"]'):
         words |= _split_into_words(sense_tag.text)
     # Extract derived forms of the headwords and their explanations
-    for derivation_tag in soup.find_all('div', class_=re.compile('div derivajho.*')):
-        for derived_form_tag in derivation_tag.find_all(
-            'strong', class_=re.compile('^d.*')
+    for derivation_tag in soup.select('div[class*="div derivajho"]'):
+        # Match any class token starting with "d", wherever it appears
+        for derived_form_tag in derivation_tag.select(
+            'strong[class^="d"], strong[class*=" d"]'
         ):
             words.add(derived_form_tag.text.replace('/', ''))
             derived_form_tag.decompose()
@@ -165,37 +236,28 @@ def _extract_words(html: str) -> set[str]:
     return words
 
 
-def _split_into_words(text: str) -> set[str]:
+# Many sense texts recur verbatim across pages, so memoize their splits
+@lru_cache(maxsize=4096)
+def _split_into_words(text: str) -> frozenset[str]:
     """Split text into words"""
     words = set()
-    for word in re.split(r'[^-\w\d]', text):
+    for match in TOKEN_REGEX.finditer(text):
+        word = match.group()
         words.add(word)
         # Some words contain "-" (e.g. pli-malpli)
         if '-' in word:
-            words |= set(word.split('-'))
-    words = set(word for word in words if _is_valid_word(word))
-
-    return words
+            words.update(word.split('-'))
 
-
-def _is_valid_word(word) -> bool:
-    if not word or word == '-':
-        return False
-    if re.search(r'[\d①-⑨]', word):
-        return False
-    return True
+    return frozenset(
+        word
+        for word in words
+        if word and word != '-' and not INVALID_WORD_REGEX.search(word)
+    )
 
 
 def _postprocess(words: Iterable[str]) -> list[str]:
     """Postprocess words (just minor changes for now)"""
-    postprocessed_words = []
-    for word in words:
-        if word in {'-½exp', '½exp', 'å', 'être'}:
-            continue
-        word = re.sub('[?!]', '', word)
-        postprocessed_words.append(word)
-
-    return postprocessed_words
+    return [word.translate(PUNCT_TABLE) for word in words if word not in SKIP_WORDS]
 
 
 def main(_argv) -> None:
@@ -203,6 +265,11 @@ def main(_argv) -> None:
 
     options = ChromeOptions()
     options.add_argument('--headless')
+    # No need to wait for the full "load" event;
+    # _fetch_html waits for the "trovoj" element itself
+    options.page_load_strategy = 'eager'
+    # Images are never used, so skip downloading them
+    options.add_argument('--blink-settings=imagesEnabled=false')
     with webdriver.Chrome(
         service=ChromeService(ChromeDriverManager().install()), options=options
     ) as driver:
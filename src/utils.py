@@ -3,30 +3,33 @@ from collections.abc import Iterable
 
 from absl import logging
 
-# For implementing Esperanto's alphabetical order
-E_ALPHABET_CODE_POINT = {
-    'Ĉ': 67.5,
-    'Ĝ': 71.5,
-    'Ĥ': 72.5,
-    'Ĵ': 74.5,
-    'Ŝ': 83.5,
-    'Ŭ': 85.5,
-    'ĉ': 99.5,
-    'ĝ': 103.5,
-    'ĥ': 104.5,
-    'ĵ': 106.5,
-    'ŝ': 115.5,
-    'ŭ': 117.5,
-}
+# For implementing Esperanto's alphabetical order:
+# each accented letter becomes the plain letter it follows plus '\uffff'
+# (which compares above every character appearing in the words),
+# so translated words sort correctly under plain string comparison
+E_SORT_TABLE = str.maketrans(
+    {
+        'Ĉ': 'C\uffff',
+        'Ĝ': 'G\uffff',
+        'Ĥ': 'H\uffff',
+        'Ĵ': 'J\uffff',
+        'Ŝ': 'S\uffff',
+        'Ŭ': 'U\uffff',
+        'ĉ': 'c\uffff',
+        'ĝ': 'g\uffff',
+        'ĥ': 'h\uffff',
+        'ĵ': 'j\uffff',
+        'ŝ': 's\uffff',
+        'ŭ': 'u\uffff',
+    }
+)
 
 
 def esorted(words):
     """Sort given words by Esperanto's alphabetical order"""
-
-    def _key_func(word):
-        return [E_ALPHABET_CODE_POINT.get(char, ord(char)) for char in word]
-
-    return sorted(words, key=_key_func)
+    # UTF-8 preserves code point order, so the encoded keys
+    # compare with a plain memcmp and stay one byte per ASCII letter
+    return sorted(words, key=lambda word: word.translate(E_SORT_TABLE).encode())
 
 
 def read_words(words_path: pathlib.Path) -> set[str]:
@@ -40,5 +43,6 @@ def read_words(words_path: pathlib.Path) -> set[str]:
 
 def save_words(words: Iterable[str], words_path: pathlib.Path) -> None:
     """Save words to given path"""
-    words_path.write_text('\n'.join(esorted(words)), encoding='utf-8')
+    with words_path.open('w', encoding='utf-8') as file:
+        file.writelines(f'{word}\n' for word in esorted(words))
     logging.info(f'Saved {len(words):,} words into {words_path}')